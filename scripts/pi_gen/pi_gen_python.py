@@ -21,23 +21,22 @@ def write_precision_file(filename, value, start_dp, end_dp, step):
         end_dp: ending decimal places
         step: increment (+1 for ascending, -1 for descending)
     """
+    # Decimal places to write, inclusive of end_dp in either direction
+    decimal_places = range(start_dp, end_dp + (1 if step > 0 else -1), step)
+
+    # Build all lines with index column, then write once
+    # Python format uses banker's rounding (round half to even)
+    lines = [
+        f"{line_no}  {int(value) if dp == 0 else f'{value:.{dp}f}'}\n"
+        for line_no, dp in enumerate(decimal_places, start=1)
+    ]
     with open(filename, "w") as f:
-        # Loop over decimal places with index column
-        line_no = 1
-        current = start_dp
-        while (step > 0 and current <= end_dp) or (step < 0 and current >= end_dp):
-            if current == 0:
-                f.write(f"{line_no}  {int(value)}\n")
-            else:
-                # Python format uses banker's rounding (round half to even)
-                f.write(f"{line_no}  {value:.{current}f}\n")
-            line_no += 1
-            current += step
+        f.write("".join(lines))
 
 
 def main():
-    # Calculate pi
-    pi = 4.0 * math.atan(1.0)
+    # math.pi is the same double as 4*atan(1), without the runtime call
+    pi = math.pi
 
     # Get machine epsilon
     epsilon = sys.float_info.epsilon
@@ -10,49 +10,123 @@ Where:
 - f00000: frequency (first number), rounded down, 5 digits with leading zeros
 
 Only renames files that don't already follow this naming pattern.
-Uses git mv if the file is tracked by git, otherwise uses regular mv.
+Files are renamed on disk; for files tracked by git, the index entries are
+then moved with a single git update-index call, as git mv would do. Tracked
+files with intent-to-add, skip-worktree or assume-unchanged flags are renamed
+with git mv instead.
 """
 
 import os
-import glob
+import posixpath
+import re
 import shutil
 import subprocess
-
-
-def is_file_tracked_by_git(filepath):
-    """Check if a file is tracked by git."""
+from concurrent.futures import ThreadPoolExecutor
+
+# Resolve git once instead of searching PATH for every subprocess call
+GIT = shutil.which("git") or "git"
+
+# Empty blob object IDs (SHA-1 and SHA-256), used for intent-to-add entries
+EMPTY_BLOB_IDS = {
+    "e69de29bb2d1d6434b8b29ae775ad8c2e48c5391",
+    "473a0f4c3be8a93681a267e3b1e9a7dcda1185436fe141f7749120a303721813",
+}
+
+# Names produced by generate_target_filename; such files are never opened.
+# The zero-padded fields widen for large values and format negative values
+# as e.g. d-005, so each group is an optionally signed run of digits
+TARGET_NAME_PATTERN = re.compile(r"^ram_.+_d-?\d+_f-?\d+\.in$")
+
+
+def get_git_index_entries(directory):
+    """Return git index entries for files under directory, keyed by path.
+
+    Keys are paths relative to directory. Each value is (mode, object, path,
+    plain), with path relative to the top of the work tree as git update-index
+    --index-info expects, or None if the file has unresolved merge conflicts.
+    plain is False for intent-to-add, skip-worktree and assume-unchanged
+    entries, whose flags --index-info would drop; those files must be moved
+    with git mv instead. The whole directory is covered by a fixed number of
+    git calls instead of one subprocess per file. Returns an empty dict if git
+    is unavailable or directory is not in a repository.
+    """
     try:
-        # Use git ls-files to check if file is tracked
-        result = subprocess.run(
-            ["git", "ls-files", "--error-unmatch", filepath],
-            capture_output=True,
-            text=True,
-            cwd=os.path.dirname(filepath),
+        prefix = subprocess.run(
+            [GIT, "rev-parse", "--show-prefix"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            cwd=directory,
+        )
+        listing = subprocess.run(
+            [GIT, "ls-files", "-s", "-t", "-v", "-z"],
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            cwd=directory,
         )
-        return result.returncode == 0
     except Exception:
-        return False
-
+        return {}
+    if prefix.returncode != 0 or listing.returncode != 0:
+        return {}
+    prefix = os.fsdecode(prefix.stdout).rstrip("\n")
+
+    # Each record is "<tag> <mode> <object> <stage>\t<path>"; tag "H" is a
+    # normal entry, "S" is skip-worktree and lowercase is assume-unchanged
+    entries = {}
+    for record in listing.stdout.split(b"\0"):
+        if not record:
+            continue
+        info, _, path = record.partition(b"\t")
+        tag, mode, obj, stage = os.fsdecode(info).split()
+        path = os.fsdecode(path)
+        if stage != "0":
+            entries[path] = None
+        else:
+            entries[path] = (mode, obj, prefix + path, tag == "H")
 
-def extract_parameters_from_file(filepath):
-    """Extract first two numbers from line 2 of the file."""
+    # Intent-to-add entries look like ordinary empty-blob entries above, but
+    # show up as added in the work tree diff
+    if any(e and e[1] in EMPTY_BLOB_IDS for e in entries.values()):
+        try:
+            added = subprocess.run(
+                [GIT, "diff", "--name-only", "--relative", "--diff-filter=A", "-z"],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.DEVNULL,
+                cwd=directory,
+            )
+        except Exception:
+            return {}
+        if added.returncode != 0:
+            return {}
+        for path in added.stdout.split(b"\0"):
+            path = os.fsdecode(path)
+            if entries.get(path):
+                entries[path] = entries[path][:3] + (False,)
+    return entries
+
+
+def extract_parameters_from_file(filepath, log=print):
+    """Extract first two numbers from line 2 of the file.
+
+    Warnings are passed to log, which defaults to print.
+    """
     try:
         with open(filepath, "r") as f:
-            lines = f.readlines()
-            if len(lines) < 2:
-                print(f"Warning: {filepath} has fewer than 2 lines")
+            # Only line 2 is needed; avoid reading the rest of the file
+            f.readline()
+            line2 = f.readline()
+            if not line2:
+                log(f"Warning: {filepath} has fewer than 2 lines")
                 return None, None
 
-            # Get line 2 (index 1)
-            line2 = lines[1].strip()
+            line2 = line2.strip()
             if not line2:
-                print(f"Warning: Line 2 is empty in {filepath}")
+                log(f"Warning: Line 2 is empty in {filepath}")
                 return None, None
 
             # Split by whitespace and get first two numbers
             parts = line2.split()
             if len(parts) < 2:
-                print(f"Warning: Line 2 has fewer than 2 values in {filepath}")
+                log(f"Warning: Line 2 has fewer than 2 values in {filepath}")
                 return None, None
 
             try:
@@ -60,16 +134,24 @@ def extract_parameters_from_file(filepath):
                 depth = float(parts[1])
                 return freq, depth
             except ValueError as e:
-                print(
-                    f"Warning: Could not parse numbers from line 2 in {filepath}: {e}"
-                )
+                log(f"Warning: Could not parse numbers from line 2 in {filepath}: {e}")
                 return None, None
 
     except Exception as e:
-        print(f"Error reading {filepath}: {e}")
+        log(f"Error reading {filepath}: {e}")
         return None, None
 
 
+def read_parameters(filepath):
+    """Extract parameters, collecting warnings instead of printing them.
+
+    Called from worker threads so that messages can be printed in file order.
+    """
+    messages = []
+    freq, depth = extract_parameters_from_file(filepath, log=messages.append)
+    return freq, depth, messages
+
+
 def generate_target_filename(original_name, freq, depth):
     """Generate the target filename based on frequency and depth."""
     # Remove .in extension to get base name
@@ -89,39 +171,70 @@ def generate_target_filename(original_name, freq, depth):
 
 
 def rename_file(source_path, target_path):
-    """Rename file using git mv if tracked by git, otherwise use regular mv."""
-    source_dir = os.path.dirname(source_path)
-    source_name = os.path.basename(source_path)
-    target_name = os.path.basename(target_path)
-
-    # Check if file is tracked by git
-    if is_file_tracked_by_git(source_path):
-        print(f"  Using git mv (file is tracked by git)")
-        try:
-            result = subprocess.run(
-                ["git", "mv", source_name, target_name],
-                cwd=source_dir,
-                capture_output=True,
-                text=True,
-            )
-            if result.returncode == 0:
-                print(f"  Successfully renamed with git mv")
-                return True
-            else:
-                print(f"  git mv failed: {result.stderr}")
-                return False
-        except Exception as e:
-            print(f"  Error with git mv: {e}")
-            return False
-    else:
-        print(f"  Using regular mv (file not tracked by git)")
-        try:
-            os.rename(source_path, target_path)
-            print(f"  Successfully renamed with regular mv")
-            return True
-        except Exception as e:
-            print(f"  Error with regular mv: {e}")
-            return False
+    """Rename file on disk; git index updates are batched by the caller."""
+    try:
+        os.rename(source_path, target_path)
+        print("  Successfully renamed")
+        return True
+    except Exception as e:
+        print(f"  Error renaming: {e}")
+        return False
+
+
+def git_mv(directory, source_name, target_name):
+    """Rename a tracked file with git mv, for index entries with flags."""
+    try:
+        result = subprocess.run(
+            [GIT, "mv", "--", source_name, target_name],
+            cwd=directory,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+    except Exception as e:
+        print(f"  Error with git mv: {e}")
+        return False
+    if result.returncode != 0:
+        print(f"  git mv failed: {result.stderr}")
+        return False
+    print("  Successfully renamed with git mv")
+    return True
+
+
+def update_git_index(directory, renames, index_entries):
+    """Move the index entries of renamed tracked files with one git call.
+
+    For each (source, target) pair, the source entry is removed and its mode
+    and object are re-added at the target path, which is what git mv does for
+    plain entries: staged content moves with the file and unstaged edits stay
+    unstaged. Entry flags are not carried over, so only entries marked plain
+    by get_git_index_entries may be passed. Records are fed to git
+    update-index --index-info on stdin, so the number of files is not limited
+    by the command-line length.
+    """
+    records = []
+    for source, target in renames:
+        mode, obj, path, _ = index_entries[source]
+        target_path = posixpath.join(posixpath.dirname(path), target)
+        records.append(f"0 {'0' * len(obj)}\t{path}")
+        records.append(f"{mode} {obj}\t{target_path}")
+    data = b"".join(os.fsencode(record) + b"\0" for record in records)
+
+    try:
+        result = subprocess.run(
+            [GIT, "update-index", "-z", "--index-info"],
+            input=data,
+            cwd=directory,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+        )
+    except Exception as e:
+        print(f"  Error updating git index: {e}")
+        return False
+    if result.returncode != 0:
+        print(f"  git update-index failed: {os.fsdecode(result.stderr)}")
+        return False
+    return True
 
 
 def main():
@@ -131,28 +244,48 @@ def main():
     print(f"Processing .in files in: {current_dir}")
 
     # Find all .in files
-    in_files = glob.glob("*.in")
+    with os.scandir(current_dir) as it:
+        entries = list(it)
+    in_files = sorted(
+        entry.name
+        for entry in entries
+        if entry.name.endswith(".in")
+        and not entry.name.startswith(".")
+        and entry.is_file(follow_symlinks=False)
+    )
+
+    # Names already in the directory, kept current as files are renamed; a
+    # hit is a known conflict, a miss is still confirmed on the filesystem
+    existing_names = {entry.name for entry in entries}
     print(f"Found {len(in_files)} .in files")
 
+    # Look up git index entries once for the whole directory
+    index_entries = get_git_index_entries(current_dir)
+
+    # Read line 2 of every file to be renamed concurrently; the reads are
+    # independent and I/O-bound, while the renames below stay sequential
+    candidates = [f for f in in_files if not TARGET_NAME_PATTERN.match(f)]
+    max_workers = min(32, (os.cpu_count() or 1) * 4)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        parameters = dict(zip(candidates, executor.map(read_parameters, candidates)))
+
     renamed_count = 0
     skipped_count = 0
+    git_renames = []
 
-    for filename in sorted(in_files):
+    for filename in in_files:
         print(f"\nProcessing: {filename}")
 
         # Check if file already follows the target naming pattern
-        if (
-            filename.startswith("ram_")
-            and "_d" in filename
-            and "_f" in filename
-            and filename.endswith(".in")
-        ):
+        if TARGET_NAME_PATTERN.match(filename):
             print(f"  Skipping: {filename} (already follows target naming pattern)")
             skipped_count += 1
             continue
 
-        # Extract parameters from file
-        freq, depth = extract_parameters_from_file(filename)
+        # Parameters extracted from file above
+        freq, depth, messages = parameters[filename]
+        for message in messages:
+            print(message)
         if freq is None or depth is None:
             print(f"  Skipping: {filename} (could not extract parameters)")
             continue
@@ -163,29 +296,58 @@ def main():
         target_name = generate_target_filename(filename, freq, depth)
         print(f"  Target name: {target_name}")
 
-        # Check if target file already exists
-        if os.path.exists(target_name):
-            if os.path.samefile(filename, target_name):
-                print(f"  Skipping: {filename} is already the target file")
-                skipped_count += 1
-                continue
-            else:
-                print(
-                    f"  Warning: Target file {target_name} already exists and is different from source"
-                )
-                print("  Consider manual intervention to avoid conflicts")
-                skipped_count += 1
-                continue
-
-        # Rename the file
         source_path = os.path.join(current_dir, filename)
         target_path = os.path.join(current_dir, target_name)
 
-        if rename_file(source_path, target_path):
+        # Check if target file already exists. The set is exact-case, so a
+        # miss is checked with lexists: on a case-insensitive filesystem a
+        # differently cased target is the same file, and rename would
+        # silently replace it. A file is never its own target: every target
+        # matches TARGET_NAME_PATTERN, so such a file was skipped above
+        if target_name in existing_names or os.path.lexists(target_path):
+            print(
+                f"  Warning: Target file {target_name} already exists and is different from source"
+            )
+            print("  Consider manual intervention to avoid conflicts")
+            skipped_count += 1
+            continue
+
+        if filename in index_entries and index_entries[filename] is None:
+            # git mv refuses to move conflicted files as well
+            print(f"  Skipping: {filename} (unresolved merge conflict in git)")
+            skipped_count += 1
+            continue
+
+        index_entry = index_entries.get(filename)
+        if index_entry and not index_entry[3]:
+            # Intent-to-add, skip-worktree and assume-unchanged flags are only
+            # kept by git mv, so these few files are not batched
+            print("  File has git index flags (using git mv)")
+            renamed = git_mv(current_dir, filename, target_name)
+        else:
+            if index_entry:
+                print("  File is tracked by git (index updated after all renames)")
+            else:
+                print("  File not tracked by git")
+            renamed = rename_file(source_path, target_path)
+            if renamed and index_entry:
+                git_renames.append((filename, target_name))
+
+        if renamed:
             renamed_count += 1
+            existing_names.discard(filename)
+            existing_names.add(target_name)
         else:
             print(f"  Failed to rename {filename}")
 
+    # Move the index entries of all tracked renames in a single git call
+    if git_renames:
+        print(f"\nUpdating git index for {len(git_renames)} tracked files")
+        if update_git_index(current_dir, git_renames, index_entries):
+            print("  Successfully updated git index")
+        else:
+            print("  Files were renamed on disk, but the git index was not updated")
+
     print("\nSummary:")
     print(f"  Files renamed: {renamed_count}")
     print(f"  Files skipped: {skipped_count}")